@@ -1,63 +1,278 @@
 import streamlit as st
-from PIL import Image, ImageEnhance
-import pytesseract
+from PIL import Image
+import numpy as np
+import cv2
+from tesserocr import PyTessBaseAPI, PSM, OEM, RIL, get_languages
 from deep_translator import GoogleTranslator
+from diskcache import Cache
 import re
 import os
-from langdetect import detect
-import uuid
+from fast_langdetect import LangDetector, LangDetectConfig
+import sys
+import hashlib
 import logging
 import io
+import queue
+from concurrent.futures import ThreadPoolExecutor
+import ahocorasick
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Tesseract configuration
-pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+# Results are only written to disk when started with `streamlit run app.py -- --save`
+SAVE_OUTPUTS = '--save' in sys.argv[1:]
+
+# Tesseract configuration (set TESSDATA_PREFIX to the folder holding eng.traineddata)
+TESSDATA_PATH = os.environ.get('TESSDATA_PREFIX') or get_languages()[0]
+# Uploads larger than this (in pixels, either side) are downscaled before OCR
+MAX_OCR_DIMENSION = 1600
+# Number of Tesseract handles kept loaded; text blocks are OCR'd in parallel across them
+OCR_WORKERS = min(4, os.cpu_count() or 1)
+# Drug names are not in Tesseract's word lists, so skip loading them; input is already dark-on-light
+TESSERACT_VARIABLES = {'load_system_dawg': '0', 'load_freq_dawg': '0', 'tessedit_do_invert': '0'}
+# Page segmentation modes offered in the UI
+PAGE_LAYOUTS = {
+    "Column / list": PSM.SINGLE_COLUMN,
+    "Dense paragraph": PSM.SINGLE_BLOCK,
+    "Sparse text": PSM.SPARSE_TEXT,
+}
+
+# Translations are cached on disk, keyed on a hash of the source language and text
+TRANSLATION_CACHE_DIR = '.trans_cache'
+# Translation requests must stay below Google's 5000 character limit
+TRANSLATION_MAX_CHARS = 4999
+# Language detection only looks at the start of the OCR text
+LANGUAGE_SAMPLE_CHARS = 512
+
+# Prescription vocabulary
+DOSAGE_KEYWORDS = ['mg', 'ml', 'g', 'mcg', 'tablet', 'capsule', 'spoon', 'drops', 'puff']
+FREQUENCY_KEYWORDS = [
+    'daily', 'once a day', 'twice a day', 'thrice a day', 'times a day',
+    'bd', 'tds', 'qid', 'od', 'hs', 'sos', 'prn', 'before food', 'after food',
+    'morning', 'noon', 'evening', 'night', 'alternate day', 'weekly'
+]
+
+# Regex patterns, compiled once at import
+_NUMBER = r'\d+(?:\.\d+)?'
+_DOSAGE_ALT = '|'.join(map(re.escape, DOSAGE_KEYWORDS))
+# Must not start inside a word or digit run; the optional country code may omit its '+'
+_PHONE_RE = re.compile(r'(?<![\w+])(?:\+?\d{1,3}[-.\s]?)?(?:\(?\d{3}\)?[-.\s]?)\d{3}[-.\s]?\d{4}\b')
+_NAME_RE = re.compile(r'^[A-Z][a-zA-Z0-9\s\-\.!]+$')
+_NAME_SYMBOLS_RE = re.compile(r'[!@#\$%\^&\*\(\)]')
+_NAME_UNIT_RES = {
+    unit: re.compile(rf'\s*{_NUMBER}\s*{re.escape(unit)}\b', re.IGNORECASE) for unit in DOSAGE_KEYWORDS
+}
+_DOSAGE_RE = re.compile(
+    rf'({_NUMBER})\s*({_DOSAGE_ALT})\b|\b({_DOSAGE_ALT})\s*({_NUMBER})', re.IGNORECASE
+)
+_NUM_ONLY_RE = re.compile(rf'(\b{_NUMBER}\b)\s*(tablet|cap)?')
+_XYZ_RE = re.compile(r'\b(\d+)\s*-\s*(\d+)\s*-\s*(\d+)\b')
+_FREQ_TIMES_RE = re.compile(rf'(\b{_NUMBER}\b)\s*(times\s*(?:a)?\s*day)', re.IGNORECASE)
+
+# All keywords are literals, so a single Aho-Corasick pass finds every occurrence
+_KEYWORD_AUTOMATON = ahocorasick.Automaton()
+for _i, _kw in enumerate(DOSAGE_KEYWORDS):
+    _KEYWORD_AUTOMATON.add_word(_kw, ('dose', _i))
+for _i, _kw in enumerate(FREQUENCY_KEYWORDS):
+    _KEYWORD_AUTOMATON.add_word(_kw, ('freq', _i))
+_KEYWORD_AUTOMATON.make_automaton()
+
+def deskew_image(gray):
+    """Rotates a grayscale array so the text lines are horizontal."""
+    # Fit the smallest rotated rectangle around all dark (ink) pixels
+    thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)[1]
+    coords = cv2.findNonZero(thresh)
+    if coords is None:
+        return gray
+    angle = cv2.minAreaRect(coords)[-1]
+    # Depending on the OpenCV version the angle is reported in [-90, 0) or (0, 90]
+    if angle > 45:
+        angle -= 90
+    elif angle < -45:
+        angle += 90
+    if abs(angle) < 0.5:
+        return gray
+    h, w = gray.shape
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    return cv2.warpAffine(gray, matrix, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
 
 def preprocess_image_for_ocr(image):
     """Preprocesses image for better OCR results."""
     try:
         # Convert to grayscale
         img = image.convert('L')
-        # Increase contrast
-        enhancer = ImageEnhance.Contrast(img)
-        img = enhancer.enhance(2.0)
-        # Basic thresholding (binarization)
-        img = img.point(lambda p: 255 if p > 150 else 0)
-        return img
+        # Shrink large photos; Tesseract time grows with pixel count
+        img.thumbnail((MAX_OCR_DIMENSION, MAX_OCR_DIMENSION), Image.Resampling.LANCZOS)
+        arr = np.array(img)
+        # Straighten skewed photos
+        arr = deskew_image(arr)
+        # Adaptive thresholding copes with uneven lighting better than a fixed cut-off
+        arr = cv2.adaptiveThreshold(arr, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 10)
+        return Image.fromarray(arr)
     except Exception as e:
         logging.error(f"Error preprocessing image: {e}")
         raise
 
-def extract_text_from_image(image_obj, lang='eng'):
+@st.cache_resource
+def get_tesseract_pool(lang='eng'):
+    """Loads one Tesseract handle per OCR worker and keeps them resident across reruns and sessions."""
+    # API objects are not thread-safe, so each handle is checked out by one thread at a time
+    pool = queue.Queue()
+    for _ in range(OCR_WORKERS):
+        pool.put(PyTessBaseAPI(
+            path=TESSDATA_PATH, lang=lang, psm=PSM.SINGLE_COLUMN, oem=OEM.LSTM_ONLY,
+            variables=TESSERACT_VARIABLES
+        ))
+    return pool
+
+def find_text_blocks(pool, image_obj):
+    """Runs layout analysis and returns crops of the text blocks in reading order."""
+    api = pool.get()
+    try:
+        api.SetPageSegMode(PSM.AUTO_ONLY)
+        api.SetImage(image_obj)
+        components = api.GetComponentImages(RIL.BLOCK, True, raw_image=True, raw_padding=4)
+        return [block for block, *_ in components]
+    finally:
+        pool.put(api)
+
+def ocr_block(pool, image_obj, psm):
+    """OCRs a single text block with the next free Tesseract handle."""
+    api = pool.get()
+    try:
+        api.SetPageSegMode(psm)
+        api.SetImage(image_obj)
+        return api.GetUTF8Text()
+    finally:
+        pool.put(api)
+
+def extract_text_from_image(image_obj, lang='eng', psm=PSM.SINGLE_COLUMN):
     """Extracts text from image using Tesseract with optimized settings."""
     try:
-        custom_config = r'--oem 3 --psm 6'
-        text = pytesseract.image_to_string(image_obj, lang=lang, config=custom_config)
+        pool = get_tesseract_pool(lang)
+    except RuntimeError:
+        return None, "Tesseract could not be initialized. Ensure the language data is installed and TESSDATA_PREFIX points to it."
+    try:
+        blocks = find_text_blocks(pool, image_obj) or [image_obj]
+        # Tesseract releases the GIL while recognizing, so blocks are OCR'd in parallel
+        with ThreadPoolExecutor(max_workers=OCR_WORKERS) as executor:
+            text = "\n".join(executor.map(lambda block: ocr_block(pool, block, psm), blocks))
         if not text.strip():
             return None, "OCR detected no text. Try a clearer image or adjust OCR settings."
         return text, None
-    except pytesseract.TesseractNotFoundError:
-        return None, "Tesseract not found. Ensure it's installed and in PATH."
     except Exception as e:
         return None, f"Error during OCR: {e}"
 
+class OCRError(Exception):
+    """Raised from the memoized OCR step so that failures are not cached."""
+
+@st.cache_data(show_spinner=False)
+def ocr_image_bytes(image_bytes, lang='eng', psm=PSM.SINGLE_COLUMN):
+    """Preprocesses and OCRs an uploaded image; only successful results are memoized on the image bytes."""
+    image = Image.open(io.BytesIO(image_bytes))
+    processed_image = preprocess_image_for_ocr(image)
+    text, error = extract_text_from_image(processed_image, lang=lang, psm=psm)
+    if error:
+        raise OCRError(error)
+    return text
+
+def run_ocr_pipeline(image_bytes, lang='eng', psm=PSM.SINGLE_COLUMN):
+    """Runs the memoized OCR step and returns (text, error) like extract_text_from_image."""
+    try:
+        return ocr_image_bytes(image_bytes, lang=lang, psm=psm), None
+    except OCRError as e:
+        return None, str(e)
+
+@st.cache_resource
+def get_translation_cache():
+    """Opens the on-disk translation cache shared by all sessions."""
+    return Cache(TRANSLATION_CACHE_DIR)
+
+@st.cache_resource
+def get_language_detector():
+    """Loads the fastText language ID model bundled with fast-langdetect once."""
+    return LangDetector(LangDetectConfig(model='lite', max_input_length=LANGUAGE_SAMPLE_CHARS))
+
+def detect_language(text):
+    """Detects the language of text from a short prefix."""
+    # Collapse OCR line breaks and runs of spaces so the model sees plain running text
+    sample = ' '.join(text[:LANGUAGE_SAMPLE_CHARS].split())
+    if not sample:
+        return 'auto'
+    # One native fastText call per sample, whatever the script, so no shortcut is needed
+    return get_language_detector().detect(sample)[0]['lang']
+
+def batch_lines(lines, max_chars):
+    """Groups lines into newline-joined batches that stay under max_chars."""
+    batch, size = [], 0
+    for line in lines:
+        if batch and size + len(line) + 1 > max_chars:
+            yield batch
+            batch, size = [], 0
+        batch.append(line)
+        size += len(line) + 1
+    if batch:
+        yield batch
+
 def translate_text_to_english(text, source_lang='auto'):
-    """Translates text to English using GoogleTranslator."""
+    """Translates text to English line by line using GoogleTranslator, reusing cached translations."""
     if not text:
         return ""
+    cache = get_translation_cache()
+    lines = text.split('\n')
+    keys = {
+        line: hashlib.sha1(f"{source_lang}|{line.strip()}".encode('utf-8')).hexdigest()
+        for line in lines if line.strip()
+    }
+    translations = {line: cache.get(key) for line, key in keys.items()}
+    missing = [line for line, translated in translations.items() if translated is None]
+    # Google rejects payloads of 5000 characters or more, so overlong lines are left as they are
+    oversized = [line for line in missing if len(line) > TRANSLATION_MAX_CHARS]
+    if oversized:
+        logging.warning(f"Skipping translation of {len(oversized)} line(s) over {TRANSLATION_MAX_CHARS} characters")
+        missing = [line for line in missing if len(line) <= TRANSLATION_MAX_CHARS]
     try:
-        translated_text = GoogleTranslator(source=source_lang, target='en').translate(text)
-        return translated_text if translated_text else text
+        translator = GoogleTranslator(source=source_lang, target='en')
     except Exception as e:
         logging.error(f"Translation error: {e}")
         return text
+    # One request per batch; a failed batch only leaves its own lines untranslated
+    for batch in batch_lines(missing, TRANSLATION_MAX_CHARS):
+        try:
+            translated_lines = translator.translate('\n'.join(batch)).split('\n')
+            if len(translated_lines) != len(batch):
+                # Line breaks were not preserved, fall back to one request per line
+                translated_lines = translator.translate_batch(batch)
+        except Exception as e:
+            logging.error(f"Translation error: {e}")
+            continue
+        for line, translated in zip(batch, translated_lines):
+            if translated:
+                translations[line] = translated
+                cache[keys[line]] = translated
+    # Blank and untranslated lines are kept as they were
+    return '\n'.join(translations.get(line) or line for line in lines)
 
 def is_likely_phone_number(text):
     """Checks if text resembles a phone number."""
-    phone_pattern = r'(\+?\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}\b'
-    return bool(re.search(phone_pattern, text))
+    # A phone number needs at least 10 digits; most lines are rejected without running the regex
+    if sum(c.isdigit() for c in text) < 10:
+        return False
+    return bool(_PHONE_RE.search(text))
+
+def scan_keywords(line_lower):
+    """Returns whether a dosage keyword occurs and the leftmost frequency keyword, if any."""
+    has_dosage = False
+    frequency_hit = None
+    for end, (kind, index) in _KEYWORD_AUTOMATON.iter(line_lower):
+        if kind == 'dose':
+            has_dosage = True
+            continue
+        # Leftmost keyword wins; on a tie prefer the one listed first
+        hit = (end - len(FREQUENCY_KEYWORDS[index]) + 1, index)
+        if frequency_hit is None or hit < frequency_hit:
+            frequency_hit = hit
+    return has_dosage, FREQUENCY_KEYWORDS[frequency_hit[1]] if frequency_hit else None
 
 def parse_medicine_details(text):
     """Parses medicine details from text."""
@@ -65,14 +280,6 @@ def parse_medicine_details(text):
     lines = text.split('\n')
     current_medicine_name = None
 
-    dosage_keywords = ['mg', 'ml', 'g', 'mcg', 'tablet', 'capsule', 'spoon', 'drops', 'puff']
-    frequency_keywords = [
-        'daily', 'once a day', 'twice a day', 'thrice a day', 'times a day',
-        'bd', 'tds', 'qid', 'od', 'hs', 'sos', 'prn', 'before food', 'after food',
-        'morning', 'noon', 'evening', 'night', 'alternate day', 'weekly'
-    ]
-    number_pattern = r'\b\d+(\.\d+)?\b'
-
     for line in lines:
         line = line.strip()
         line_lower = line.lower()
@@ -82,29 +289,30 @@ def parse_medicine_details(text):
         if is_likely_phone_number(line):
             continue
 
-        name_pattern = r'^[A-Z][a-zA-Z0-9\s\-\.!]+$'
-        if re.match(name_pattern, line) and not any(freq in line_lower for freq in frequency_keywords):
-            current_medicine_name = re.sub(r'[!@#\$%\^&\*\(\)]', '', line).strip()
-            for unit in dosage_keywords:
+        has_dosage, frequency_keyword = scan_keywords(line_lower)
+        # Cheap character tests let most lines skip the regexes below entirely
+        has_digits = any(c.isdigit() for c in line)
+
+        if line[0].isupper() and _NAME_RE.match(line) and not frequency_keyword:
+            current_medicine_name = _NAME_SYMBOLS_RE.sub('', line).strip()
+            for unit in DOSAGE_KEYWORDS:
                 if current_medicine_name.lower().endswith(f" {unit}"):
-                    current_medicine_name = re.sub(fr'\s*\d+(\.\d+)?\s*{unit}\b', '', current_medicine_name, flags=re.IGNORECASE).strip()
+                    current_medicine_name = _NAME_UNIT_RES[unit].sub('', current_medicine_name).strip()
                     break
             continue
 
         dosage = "Not specified"
         frequency = "Not specified"
 
-        dosage_match = re.search(
-            fr'({number_pattern})\s*({"|".join(dosage_keywords)})\b|\b({"|".join(dosage_keywords)})\s*({number_pattern})',
-            line_lower, re.IGNORECASE
-        )
+        # The dosage regex can only match when a dosage keyword and a number are present
+        dosage_match = _DOSAGE_RE.search(line_lower) if has_dosage and has_digits else None
         if dosage_match:
             if dosage_match.group(1) and dosage_match.group(2):
                 dosage = f"{dosage_match.group(1)} {dosage_match.group(2)}"
             elif dosage_match.group(3) and dosage_match.group(4):
                 dosage = f"{dosage_match.group(4)} {dosage_match.group(3)}"
-        else:
-            num_only_match = re.search(fr'({number_pattern})\s*(tablet|cap)?', line_lower)
+        elif has_digits:
+            num_only_match = _NUM_ONLY_RE.search(line_lower)
             if num_only_match and (current_medicine_name or 'tablet' in line_lower or 'cap' in line_lower):
                 dosage = num_only_match.group(1)
                 if 'tablet' in line_lower:
@@ -112,17 +320,15 @@ def parse_medicine_details(text):
                 elif 'cap' in line_lower:
                     dosage += " capsule(s)"
 
-        xyz_match = re.search(r'\b(\d+)\s*-\s*(\d+)\s*-\s*(\d+)\b', line_lower)
+        xyz_match = _XYZ_RE.search(line_lower) if has_digits else None
         if xyz_match:
             frequency = f"Morning: {xyz_match.group(1)}, Afternoon: {xyz_match.group(2)}, Night: {xyz_match.group(3)}"
         else:
-            for kw in frequency_keywords:
-                freq_num_match = re.search(fr'({number_pattern})\s*({kw}|times\s*(a)?\s*day)', line_lower, re.IGNORECASE)
-                if freq_num_match and "times" in freq_num_match.group(2):
-                    frequency = f"{freq_num_match.group(1)} {freq_num_match.group(2)}"
-                elif kw in line_lower:
-                    frequency = kw
-                    break
+            freq_num_match = _FREQ_TIMES_RE.search(line_lower) if has_digits else None
+            if freq_num_match:
+                frequency = f"{freq_num_match.group(1)} {freq_num_match.group(2)}"
+            elif frequency_keyword:
+                frequency = frequency_keyword
 
         if current_medicine_name:
             medicines.append({
@@ -136,6 +342,30 @@ def parse_medicine_details(text):
         return [{"name": "Could not parse medicine details", "dosage": "", "frequency": ""}]
     return medicines
 
+def format_medicine_details(medicine_details):
+    """Formats parsed medicines as the text of the medicine details download."""
+    parts = ["Medicine Details:\n", "="*30, "\n"]
+    parts.extend(
+        f"Medicine Name: {med['name']}\n"
+        f"Dosage: {med['dosage']}\n"
+        f"Frequency: {med['frequency']}\n"
+        f"{'-'*20}\n"
+        for med in medicine_details
+    )
+    return "".join(parts)
+
+def format_full_details(translated_text, detected_text):
+    """Formats the translated and raw OCR text as the text of the full details download."""
+    return "".join([
+        "Translated Text:\n", "="*30, "\n", translated_text,
+        "\n\nRaw OCR Text:\n", "="*30, "\n", detected_text
+    ])
+
+def content_filename(prefix, content):
+    """Names an output file after a hash of its content."""
+    digest = hashlib.sha1(content).hexdigest()[:16]
+    return f"{prefix}_{digest}.txt"
+
 def main():
     st.title("Handwritten Prescription Extractor")
     st.write("Upload a prescription image to extract medicine details.")
@@ -144,9 +374,11 @@ def main():
     uploaded_file = st.file_uploader("Choose a prescription image", type=["png", "jpg", "jpeg"])
 
     if uploaded_file is not None:
-        # Display uploaded image
-        image = Image.open(uploaded_file)
-        st.image(image, caption="Uploaded Prescription", width=400)
+        # Display uploaded image from its raw bytes; a PIL image would be decoded and re-encoded first
+        image_bytes = uploaded_file.getvalue()
+        st.image(image_bytes, caption="Uploaded Prescription", width=400)
+
+        layout = st.radio("Prescription layout", list(PAGE_LAYOUTS), horizontal=True)
 
         if st.button("Extract Medicine Details"):
             with st.spinner("Processing..."):
@@ -158,19 +390,16 @@ def main():
                     log_lines.append(message)
                     log_placeholder.text("\n".join(log_lines))
 
-                # Preprocess image
-                update_log("1. Preprocessing image...")
+                # Preprocess image and OCR (memoized on the uploaded bytes)
+                update_log("1. Preprocessing image and performing OCR...")
                 try:
-                    processed_image = preprocess_image_for_ocr(image)
-                    update_log("   Preprocessing complete.")
+                    detected_text, ocr_error = run_ocr_pipeline(
+                        image_bytes, lang='eng', psm=PAGE_LAYOUTS[layout]
+                    )
                 except Exception as e:
                     update_log(f"   Error preprocessing: {e}")
                     st.error("Error during preprocessing.")
                     return
-
-                # OCR
-                update_log("2. Performing OCR...")
-                detected_text, ocr_error = extract_text_from_image(processed_image, lang='eng')
                 if ocr_error:
                     update_log(f"   OCR Error: {ocr_error}")
                     st.error("OCR failed.")
@@ -183,18 +412,22 @@ def main():
                 update_log(f"   Raw OCR Text (first 200 chars): {detected_text[:200]}...")
                 
                 # Language detection and translation
-                update_log("3. Detecting language and translating...")
+                update_log("2. Detecting language and translating...")
                 try:
-                    source_lang = detect(detected_text) if detected_text.strip() else 'auto'
+                    source_lang = detect_language(detected_text)
                     update_log(f"   Detected language: {source_lang}")
-                    translated_text = translate_text_to_english(detected_text, source_lang)
-                    update_log(f"   Translated Text (first 200 chars): {translated_text[:200]}...")
+                    if source_lang == 'en':
+                        translated_text = detected_text
+                        update_log("   Text is already in English, skipping translation.")
+                    else:
+                        translated_text = translate_text_to_english(detected_text, source_lang)
+                        update_log(f"   Translated Text (first 200 chars): {translated_text[:200]}...")
                 except Exception as e:
                     update_log(f"   Language detection/translation failed: {e}. Using original text.")
                     translated_text = detected_text
 
                 # Parse medicine details
-                update_log("4. Parsing medicine details...")
+                update_log("3. Parsing medicine details...")
                 medicine_details = parse_medicine_details(translated_text)
                 update_log("   Extracted details:")
                 for med in medicine_details:
@@ -202,52 +435,45 @@ def main():
                     update_log(f"     Dosage: {med['dosage']}")
                     update_log(f"     Frequency: {med['frequency']}")
 
-                # Save to files
-                update_log("5. Saving to files...")
+                # Prepare downloads
+                update_log("4. Preparing downloads...")
                 try:
                     # Medicine details file
-                    medicine_filename = f"medicine_details_{uuid.uuid4().hex}.txt"
-                    medicine_content = "Medicine Details:\n" + "="*30 + "\n"
-                    for med in medicine_details:
-                        medicine_content += f"Medicine Name: {med['name']}\n"
-                        medicine_content += f"Dosage: {med['dosage']}\n"
-                        medicine_content += f"Frequency: {med['frequency']}\n"
-                        medicine_content += "-"*20 + "\n"
-                    with open(medicine_filename, "w", encoding="utf-8") as f:
-                        f.write(medicine_content)
-                    update_log(f"   Saved medicine details to {medicine_filename}")
+                    medicine_content = format_medicine_details(medicine_details).encode("utf-8")
+                    medicine_filename = content_filename("medicine_details", medicine_content)
 
                     # Full details file
-                    full_filename = f"prescription_full_details_{uuid.uuid4().hex}.txt"
-                    full_content = "Translated Text:\n" + "="*30 + "\n" + translated_text
-                    full_content += "\n\nRaw OCR Text:\n" + "="*30 + "\n" + detected_text
-                    with open(full_filename, "w", encoding="utf-8") as f:
-                        f.write(full_content)
-                    update_log(f"   Saved full details to {full_filename}")
-
-                    # Provide download buttons
-                    with open(medicine_filename, "rb") as f:
-                        st.download_button(
-                            label="Download Medicine Details",
-                            data=f,
-                            file_name=medicine_filename,
-                            mime="text/plain"
-                        )
-                    with open(full_filename, "rb") as f:
-                        st.download_button(
-                            label="Download Full Details",
-                            data=f,
-                            file_name=full_filename,
-                            mime="text/plain"
-                        )
-
-                    st.success(f"Processing complete! Saved to {medicine_filename} and {full_filename}")
-                    logging.info(f"Medicine details saved to {medicine_filename}")
-                    logging.info(f"Full details saved to {full_filename}")
+                    full_content = format_full_details(translated_text, detected_text).encode("utf-8")
+                    full_filename = content_filename("prescription_full_details", full_content)
+
+                    # Same content maps to the same name, so repeated runs overwrite rather than pile up
+                    if SAVE_OUTPUTS:
+                        for filename, content in ((medicine_filename, medicine_content), (full_filename, full_content)):
+                            with open(filename, "wb") as f:
+                                f.write(content)
+                            update_log(f"   Saved {filename}")
+
+                    # Provide download buttons straight from memory
+                    st.download_button(
+                        label="Download Medicine Details",
+                        data=medicine_content,
+                        file_name=medicine_filename,
+                        mime="text/plain"
+                    )
+                    st.download_button(
+                        label="Download Full Details",
+                        data=full_content,
+                        file_name=full_filename,
+                        mime="text/plain"
+                    )
+                    update_log("   Downloads ready.")
+
+                    st.success("Processing complete! Use the buttons above to download the results.")
+                    logging.info(f"Prepared downloads {medicine_filename} and {full_filename}")
                 except Exception as e:
-                    update_log(f"   Error saving files: {e}")
-                    st.error("Error saving files.")
-                    logging.error(f"Error saving files: {e}")
+                    update_log(f"   Error preparing downloads: {e}")
+                    st.error("Error preparing downloads.")
+                    logging.error(f"Error preparing downloads: {e}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file